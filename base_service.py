@@ -7,20 +7,70 @@ Handles keyboard shortcuts, ollama communication, and service infrastructure.
 import os
 import sys
 import time
+import signal
 import subprocess
-import requests
-import json
+import asyncio
 import threading
 import logging
+import hashlib
+import sqlite3
+import aiohttp
+import orjson
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
 from pynput import keyboard
 from pynput.keyboard import Key, Listener
 
+try:
+    import hnswlib
+except ImportError:  # Only needed for the optional semantic cache
+    hnswlib = None
+
+try:
+    from x11_display import X11Display
+except ImportError:  # python-xlib not installed; fall back to xclip/xdotool
+    X11Display = None
+
 # Configure logging
 log_level = logging.DEBUG if os.getenv('DEBUG') else logging.INFO
 logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Modifier keys tracked by the pynput fallback listener
+CTRL_KEYS = frozenset({Key.ctrl, Key.ctrl_l, Key.ctrl_r})
+ALT_KEYS = frozenset({Key.alt, Key.alt_l, Key.alt_r})
+
+# Shortcut presses less than this (in seconds) after the previous press are ignored
+TRIGGER_DEBOUNCE_S = 0.5
+
+# Request headers for JSON bodies serialized with orjson
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Stands in for the user content while a chat payload template is serialized
+USER_PLACEHOLDER = "\x00keybindllm-user-input\x00"
+
+# On-disk location for caches shared across service restarts
+CACHE_DIR = os.path.expanduser(os.getenv('KEYBINDLLM_CACHE_DIR', '~/.cache/keybindllm'))
+
+# Response cache bounds: entries kept in memory, rows kept on disk, and their max age
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_MAX_ROWS = 1000
+RESPONSE_CACHE_TTL_S = 7 * 24 * 3600
+
+# A successful Ollama check younger than this (in seconds) is trusted on restart
+OLLAMA_CHECK_TTL_S = 60
+
+# How long (in seconds) to wait for a freshly started ollama service, and how often to poll it
+OLLAMA_START_TIMEOUT_S = 10
+OLLAMA_START_POLL_INTERVAL_S = 0.1
+
+# A streamed response that produces nothing for this long (in seconds) is abandoned
+STREAM_READ_TIMEOUT_S = 30
+
+# Loading model weights can take far longer than a normal request
+MODEL_LOAD_TIMEOUT_S = 300
+
 
 class BaseAIService(ABC):
     """Base class for AI-powered text processing services"""
@@ -30,124 +80,403 @@ class BaseAIService(ABC):
         self.ollama_model = os.getenv('OLLAMA_MODEL', 'gemma3')
         self.keynum = int(os.getenv('REPHRASE_KEYNUM', '0'))  # TODO: Make this more generic
         self.ollama_url = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+        # How long Ollama keeps the model loaded after each request
+        self.keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '24h')
+        
+        # Modifier state and target character for combination detection
+        self._ctrl = False
+        self._alt = False
+        self._target = str(self.keynum)
+        
+        # Debounce state for shortcut triggers
+        self._trigger_lock = threading.Lock()
+        self._last_trigger_ts = float('-inf')
+        
+        # Event loop for Ollama I/O (runs on a dedicated thread, started in run())
+        self._loop = None
+        self._session = None
+        # Set once _pin_model has loaded the model, so startup loads it only once
+        self._model_loaded = False
+        
+        # Persistent X connection for selections and fake input (None if unavailable)
+        self.x11 = self._connect_x11()
         
-        # Track pressed keys for combination detection
-        self.pressed_keys = set()
+        # Exact-match response cache: LRU in memory, optionally backed by sqlite on disk.
+        # The disk cache stores selected text in plaintext; KEYBINDLLM_DISK_CACHE=0 disables it.
+        self._cache = OrderedDict()
+        self.disk_cache = os.getenv('KEYBINDLLM_DISK_CACHE', '1') != '0'
+        self._cache_db = self._open_cache_db() if self.disk_cache else None
+        
+        # Semantic cache for near-duplicate inputs (opt-in: set OLLAMA_EMBED_MODEL)
+        self.embed_model = os.getenv('OLLAMA_EMBED_MODEL', '')
+        self.semantic_threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.97'))
+        if self.embed_model and hnswlib is None:
+            logger.warning("⚠️  hnswlib not installed, semantic cache disabled")
+            self.embed_model = ''
+        # (model, system prompt) -> (hnswlib index, cached responses by label)
+        self._semantic_indexes = {}
+        # (model, system prompt) -> next slot to fill in that scope's index
+        self._semantic_counts = {}
+        
+        # System prompt -> serialized chat payload (prefix, suffix) around the user content
+        self._chat_templates = {}
         
         logger.info(f"Initializing {service_name} service")
         logger.info(f"Model: {self.ollama_model}")
         logger.info(f"Shortcut: Ctrl+Alt+{self.keynum}")
     
-    def ensure_ollama_running(self):
-        """Ensure ollama service is running and model is loaded"""
-        # Step 1: Check if ollama service is responding
+    def _start_event_loop(self):
+        """Start the asyncio event loop on a dedicated background thread"""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name=f"{self.service_name}-loop", daemon=True).start()
+    
+    def run_coroutine(self, coro):
+        """Run a coroutine on the service event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _open_session(self):
+        """Create the HTTP session shared by all Ollama requests (keeps connections alive)"""
+        # A small pool is plenty for one service; idle connections are kept open
+        # between triggers so requests skip the TCP handshake.
+        connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=300)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=30))
+    
+    def _post_json(self, url: str, payload: dict, **kwargs):
+        """POST payload to Ollama, serialized with orjson"""
+        return self._session.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS, **kwargs)
+    
+    async def _close_session(self):
+        """Close the shared HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def _connect_x11(self):
+        """Open the persistent X11 connection, or return None to fall back to xclip/xdotool"""
+        if X11Display is None:
+            logger.info("python-xlib not installed, using xclip/xdotool")
+            return None
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                logger.info("✓ Ollama service is running")
-            else:
-                logger.error("✗ Ollama service not responding")
-                return False
-        except requests.exceptions.RequestException:
-            logger.info("Ollama not responding, attempting to start...")
-            
-            try:
-                # Try to start ollama service
-                subprocess.run(['systemctl', '--user', 'start', 'ollama'], check=True)
-                time.sleep(3)  # Give it time to start
-                
-                # Verify it's running
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=10)
-                if response.status_code != 200:
-                    logger.error("Failed to start Ollama service")
-                    return False
+            return X11Display()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not connect to X display, using xclip/xdotool: {e}")
+            return None
+    
+    def _open_cache_db(self):
+        """Open the on-disk response cache, or return None if it is unavailable"""
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Opened on the main thread but used from the event loop thread
+            db = sqlite3.connect(os.path.join(CACHE_DIR, 'responses.db'), check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS responses(key TEXT PRIMARY KEY, response TEXT, created REAL)")
+            # Age out old entries on startup
+            db.execute("DELETE FROM responses WHERE created < ?", (time.time() - RESPONSE_CACHE_TTL_S,))
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️  Response cache disabled: {e}")
+            return None
+    
+    def _cache_key(self, system_prompt: str, user_input: str) -> str:
+        """Return the cache key for a (model, system prompt, user input) request"""
+        return hashlib.sha256(f"{self.ollama_model}|{system_prompt}|{user_input}".encode()).hexdigest()
+    
+    def _cache_remember(self, key: str, response: str):
+        """Store a response in the in-memory LRU, evicting the least recently used entry"""
+        self._cache[key] = response
+        self._cache.move_to_end(key)
+        if len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def _cache_get(self, key: str):
+        """Look up a cached response, checking memory before disk"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if self._cache_db is None:
+            return None
+        try:
+            row = self._cache_db.execute("SELECT response FROM responses WHERE key=? AND created >= ?",
+                                         (key, time.time() - RESPONSE_CACHE_TTL_S)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Response cache lookup failed: {e}")
+            return None
+        if row is not None:
+            self._cache_remember(key, row[0])
+            return row[0]
+        return None
+    
+    def _cache_put(self, key: str, response: str):
+        """Store a response in the memory and on-disk caches"""
+        self._cache_remember(key, response)
+        if self._cache_db is None:
+            return
+        try:
+            self._cache_db.execute("INSERT OR REPLACE INTO responses(key, response, created) VALUES (?, ?, ?)",
+                                   (key, response, time.time()))
+            # Keep only the newest rows
+            self._cache_db.execute("DELETE FROM responses WHERE key NOT IN "
+                                   "(SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+                                   (RESPONSE_CACHE_MAX_ROWS,))
+            self._cache_db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Failed to store response in cache: {e}")
+    
+    async def _embed(self, text: str):
+        """Return the embedding of text from the embedding model, or None on failure"""
+        try:
+            payload = {"model": self.embed_model, "input": text, "keep_alive": self.keep_alive}
+            async with self._post_json(f"{self.ollama_url}/api/embed", payload) as response:
+                response.raise_for_status()
+                result = orjson.loads(await response.read())
+            return result['embeddings'][0]
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError, KeyError, IndexError) as e:
+            logger.warning(f"⚠️  Embedding failed, skipping semantic cache: {e}")
+            return None
+    
+    def _semantic_get(self, system_prompt: str, vector):
+        """Return the cached response for the most similar previous input, if close enough"""
+        entry = self._semantic_indexes.get((self.ollama_model, system_prompt))
+        if entry is None or entry[0].get_current_count() == 0:
+            return None
+        index, responses = entry
+        labels, distances = index.knn_query(vector, k=1)
+        similarity = 1 - distances[0][0]
+        logger.debug("Closest cached input similarity: %.4f", similarity)
+        if similarity >= self.semantic_threshold:
+            return responses[labels[0][0]]
+        return None
+    
+    def _semantic_put(self, system_prompt: str, vector, response: str):
+        """Add an input embedding and its response to the semantic cache"""
+        scope = (self.ollama_model, system_prompt)
+        if scope not in self._semantic_indexes:
+            index = hnswlib.Index(space='cosine', dim=len(vector))
+            index.init_index(max_elements=RESPONSE_CACHE_SIZE, ef_construction=200, M=16)
+            self._semantic_indexes[scope] = (index, [])
+        index, responses = self._semantic_indexes[scope]
+        # Bounded like the exact-match cache: once full, overwrite the oldest slot in turn
+        # (adding an existing label replaces that element in the index)
+        label = self._semantic_counts.get(scope, 0) % RESPONSE_CACHE_SIZE
+        self._semantic_counts[scope] = label + 1
+        index.add_items([vector], [label])
+        if label < len(responses):
+            responses[label] = response
+        else:
+            responses.append(response)
+    
+    async def _fetch_tags(self, timeout: float):
+        """Return the parsed /api/tags response, or None if Ollama did not answer"""
+        try:
+            async with self._session.get(f"{self.ollama_url}/api/tags", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    return None
+                return orjson.loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError):
+            return None
+    
+    async def _get_tags(self, retry_after_start: bool = True):
+        """Fetch the model list, starting the ollama service first if it is not responding"""
+        tags = await self._fetch_tags(timeout=5)
+        if tags is not None:
+            logger.info("✓ Ollama service is running")
+            return tags
+        if not retry_after_start:
+            return None
+        
+        logger.info("Ollama not responding, attempting to start...")
+        try:
+            # Try to start ollama service
+            subprocess.run(['systemctl', '--user', 'start', 'ollama'], check=True)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            logger.error(f"✗ Failed to start ollama: {e}")
+            return None
+        
+        # Poll until it answers instead of sleeping a fixed amount
+        deadline = time.monotonic() + OLLAMA_START_TIMEOUT_S
+        while time.monotonic() < deadline:
+            tags = await self._fetch_tags(timeout=0.5)
+            if tags is not None:
                 logger.info("✓ Ollama service started successfully")
-            except (subprocess.CalledProcessError, requests.exceptions.RequestException) as e:
-                logger.error(f"✗ Failed to start ollama: {e}")
-                return False
+                return tags
+            await asyncio.sleep(OLLAMA_START_POLL_INTERVAL_S)
         
-        # Step 2: Check if the specific model is available
+        logger.error("Failed to start Ollama service")
+        return None
+    
+    def _ollama_sentinel(self) -> str:
+        """Path of the file marking a recent successful Ollama check for this model"""
+        return os.path.join(CACHE_DIR, f"ollama_ok.{self.ollama_model.replace('/', '_')}")
+    
+    async def ensure_ollama_running(self):
+        """Ensure ollama service is running and model is loaded"""
+        # Skip the full check if it succeeded moments ago (e.g. a quick restart)
+        sentinel = self._ollama_sentinel()
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            models_data = response.json()
-            available_models = [model['name'].split(':')[0] for model in models_data.get('models', [])]
-            
-            logger.info(f"Available models: {available_models}")
-            
-            if self.ollama_model not in available_models:
-                logger.warning(f"⚠️  Model '{self.ollama_model}' not found in available models")
-                logger.info(f"Attempting to pull model '{self.ollama_model}' using CLI...")
-                
-                # Use ollama CLI to pull the model instead of API
-                try:
-                    # Don't capture output so progress is shown in real-time
-                    # No timeout - let it run as long as needed
-                    result = subprocess.run(['ollama', 'pull', self.ollama_model], 
-                                          check=True)
-                    logger.info(f"✓ Model '{self.ollama_model}' pulled successfully")
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"✗ Failed to pull model '{self.ollama_model}': {e}")
-                    return False
-                except FileNotFoundError:
-                    logger.error("✗ 'ollama' command not found. Make sure Ollama CLI is installed and in PATH.")
-                    return False
-            else:
-                logger.info(f"✓ Model '{self.ollama_model}' is available")
+            recently_checked = time.time() - os.path.getmtime(sentinel) < OLLAMA_CHECK_TTL_S
+        except OSError:
+            recently_checked = False
+        if recently_checked and await self._fetch_tags(timeout=2) is not None:
+            logger.info("✓ Ollama was checked recently and is responding")
+            return True
+        
+        if not await self._check_ollama():
+            return False
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            Path(sentinel).touch()
+        except OSError as e:
+            logger.debug("Could not write Ollama check sentinel: %s", e)
+        return True
+    
+    async def _check_ollama(self):
+        """Check that ollama is running and the model is available, starting/pulling as needed"""
+        # Step 1: Check if ollama service is responding (one /api/tags request serves steps 1 and 2)
+        tags = await self._get_tags(retry_after_start=True)
+        if tags is None:
+            return False
         
-        except requests.exceptions.RequestException as e:
+        # Step 2: Check if the specific model is available
+        try:
+            available_models = [model['name'].split(':')[0] for model in tags.get('models', [])]
+        except (KeyError, AttributeError) as e:
             logger.error(f"✗ Failed to check model availability: {e}")
             return False
         
-        # Step 3: Test the model with a simple request
+        logger.info(f"Available models: {available_models}")
+        
+        model_was_present = self.ollama_model in available_models
+        if model_was_present:
+            # Ollama loads the model lazily (run() also preloads it), so there is nothing to test
+            logger.info(f"✓ Model '{self.ollama_model}' is available")
+            return True
+        
+        logger.warning(f"⚠️  Model '{self.ollama_model}' not found in available models")
+        logger.info(f"Attempting to pull model '{self.ollama_model}' using CLI...")
+        
+        # Use ollama CLI to pull the model instead of API
         try:
-            logger.info(f"Testing model '{self.ollama_model}' with a simple request...")
-            test_payload = {
-                "model": self.ollama_model,
-                "messages": [{"role": "user", "content": "test"}],
-                "stream": False
-            }
-            
-            test_response = requests.post(f"{self.ollama_url}/api/chat", 
-                                        json=test_payload, timeout=30)
-            
-            if test_response.status_code == 200:
-                logger.info(f"✅ Model '{self.ollama_model}' is loaded and responding")
-                return True
-            else:
-                logger.error(f"✗ Model test failed: {test_response.text}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"✗ Model test failed: {e}")
+            # Don't capture output so progress is shown in real-time
+            # No timeout - let it run as long as needed
+            subprocess.run(['ollama', 'pull', self.ollama_model], check=True)
+            logger.info(f"✓ Model '{self.ollama_model}' pulled successfully")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"✗ Failed to pull model '{self.ollama_model}': {e}")
+            return False
+        except FileNotFoundError:
+            logger.error("✗ 'ollama' command not found. Make sure Ollama CLI is installed and in PATH.")
             return False
+        
+        # Step 3: Confirm the freshly pulled weights load, without generating any tokens
+        logger.info(f"Loading model '{self.ollama_model}'...")
+        return await self._pin_model()
     
-    def send_to_ollama(self, system_prompt: str, user_input: str) -> str:
-        """Send text to ollama for processing"""
+    async def _pin_model(self) -> bool:
+        """Load the model and keep it resident so the first trigger does not pay for loading it"""
         try:
-            logger.info(f"🤖 Sending text to {self.ollama_model} for processing...")
-            logger.debug(f"Input text length: {len(user_input)} characters")
-            
+            # An empty generate request only loads the model; no tokens are generated
+            payload = {"model": self.ollama_model, "keep_alive": self.keep_alive}
+            async with self._post_json(f"{self.ollama_url}/api/generate", payload,
+                                       timeout=aiohttp.ClientTimeout(total=MODEL_LOAD_TIMEOUT_S)) as response:
+                if response.status != 200:
+                    logger.error(f"✗ Failed to load model '{self.ollama_model}': {await response.text()}")
+                    return False
+            logger.info(f"✅ Model '{self.ollama_model}' is loaded (keep_alive: {self.keep_alive})")
+            self._model_loaded = True
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"✗ Failed to load model '{self.ollama_model}': {e}")
+            return False
+    
+    def _chat_template(self, system_prompt: str):
+        """Return the serialized chat payload for system_prompt, split around the user content"""
+        template = self._chat_templates.get(system_prompt)
+        if template is None:
             payload = {
                 "model": self.ollama_model,
                 "messages": [
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
+                    {"role": "user", "content": USER_PLACEHOLDER}
                 ],
-                "stream": False
+                "stream": True,
+                "keep_alive": self.keep_alive
             }
-            
-            response = requests.post(f"{self.ollama_url}/api/chat", 
-                                   json=payload, timeout=30)
+            prefix, suffix = orjson.dumps(payload).split(orjson.dumps(USER_PLACEHOLDER))
+            template = self._chat_templates[system_prompt] = (prefix, suffix)
+        return template
+    
+    async def stream_from_ollama(self, system_prompt: str, user_input: str):
+        """Stream text from ollama, yielding response chunks as they arrive"""
+        key = self._cache_key(system_prompt, user_input)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info("⚡ Using cached response")
+            yield cached
+            return
+        
+        # Near-duplicate inputs can reuse a previous response
+        vector = await self._embed(user_input) if self.embed_model else None
+        if vector is not None:
+            cached = self._semantic_get(system_prompt, vector)
+            if cached is not None:
+                logger.info("⚡ Using cached response for a near-identical input")
+                yield cached
+                return
+        
+        logger.info(f"🤖 Sending text to {self.ollama_model} for processing...")
+        logger.debug(f"Input text length: {len(user_input)} characters")
+        
+        prefix, suffix = self._chat_template(system_prompt)
+        data = prefix + orjson.dumps(user_input) + suffix
+        
+        chunks = []
+        done = False
+        # No total timeout: a steadily streaming generation may run long; only stalls fail it
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=STREAM_READ_TIMEOUT_S)
+        async with self._session.post(f"{self.ollama_url}/api/chat", data=data, headers=JSON_HEADERS,
+                                      timeout=timeout) as response:
             response.raise_for_status()
-            
-            result = response.json()
-            processed_text = result['message']['content'].strip()
+            # Ollama streams one JSON object per line
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                chunk = orjson.loads(line)
+                if 'error' in chunk:
+                    raise RuntimeError(chunk['error'])
+                content = chunk['message']['content']
+                if content:
+                    chunks.append(content)
+                    yield content
+                if chunk.get('done'):
+                    done = True
+                    # Only complete responses are cached
+                    processed_text = ''.join(chunks).strip()
+                    self._cache_put(key, processed_text)
+                    if vector is not None:
+                        self._semantic_put(system_prompt, vector, processed_text)
+                    break
+        
+        if not done:
+            raise RuntimeError("Ollama response ended before completion")
+    
+    async def send_to_ollama(self, system_prompt: str, user_input: str, on_chunk=None) -> str:
+        """Send text to ollama for processing.
+        
+        If given, on_chunk is called with the text received so far each time a chunk arrives.
+        """
+        try:
+            text = ""
+            async for chunk in self.stream_from_ollama(system_prompt, user_input):
+                text += chunk
+                if on_chunk is not None:
+                    on_chunk(text)
+            processed_text = text.strip()
             
             logger.info(f"✅ Text processed successfully (length: {len(processed_text)} characters)")
-            logger.debug(f"Model response: {result}")
             return processed_text
             
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"❌ Failed to process text: {e}")
             return None
         except KeyError as e:
@@ -163,71 +492,84 @@ class BaseAIService(ABC):
         pass
     
     @abstractmethod
-    def process_trigger(self):
+    async def process_trigger(self):
         """Handle the service-specific processing when shortcut is triggered"""
         pass
     
-    def handle_shortcut(self):
+    def trigger_shortcut(self):
+        """Schedule shortcut handling on the event loop (safe to call from any thread)"""
+        now = time.monotonic()
+        with self._trigger_lock:
+            # Every press (including dropped ones) restarts the window, so a held chord's
+            # auto-repeat never re-triggers; only a pause of TRIGGER_DEBOUNCE_S does
+            last, self._last_trigger_ts = self._last_trigger_ts, now
+            if now - last < TRIGGER_DEBOUNCE_S:
+                logger.debug("Ignoring repeated shortcut press")
+                return
+        
+        asyncio.run_coroutine_threadsafe(self.handle_shortcut_async(), self._loop)
+    
+    async def handle_shortcut_async(self):
         """Handle the keyboard shortcut trigger - calls service-specific processing"""
         logger.info(f"🚀 {self.service_name} shortcut detected, processing...")
         
         try:
-            self.process_trigger()
+            await self.process_trigger()
         except Exception as e:
             logger.error(f"❌ Error in {self.service_name} processing: {e}")
     
     def on_press(self, key):
         """Handle key press events"""
         try:
-            self.pressed_keys.add(key)
+            # Debug logging (lazy %-formatting: nothing is formatted unless DEBUG is enabled)
+            logger.debug("Key pressed: %s", key)
             
-            # Debug logging
-            logger.debug(f"Key pressed: {key}")
-            logger.debug(f"Currently pressed keys: {self.pressed_keys}")
+            if key in CTRL_KEYS:
+                self._ctrl = True
+                return
+            if key in ALT_KEYS:
+                self._alt = True
+                return
             
             # Check for Ctrl+Alt+[number] combination
-            ctrl_pressed = Key.ctrl_l in self.pressed_keys or Key.ctrl_r in self.pressed_keys
-            alt_pressed = Key.alt_l in self.pressed_keys or Key.alt_r in self.pressed_keys
-            
-            # Debug the modifier keys
-            if ctrl_pressed or alt_pressed:
-                logger.info(f"Modifiers detected - Ctrl: {ctrl_pressed}, Alt: {alt_pressed}")
-            
-            if ctrl_pressed and alt_pressed:
-                logger.info(f"Ctrl+Alt detected! Checking for number key...")
-                try:
-                    # Check if the pressed key is our target number
-                    if hasattr(key, 'char') and key.char is not None:
-                        logger.info(f"Character key pressed: '{key.char}', target: '{self.keynum}'")
-                        if key.char == str(self.keynum):
-                            logger.info(f"🎯 SHORTCUT TRIGGERED: Ctrl+Alt+{self.keynum}")
-                            # Run in separate thread to avoid blocking the listener
-                            threading.Thread(target=self.handle_shortcut, daemon=True).start()
-                    else:
-                        logger.debug(f"Non-character key: {key}")
-                except AttributeError as e:
-                    logger.debug(f"Key attribute error: {e}")
+            if self._ctrl and self._alt:
+                char = getattr(key, 'char', None)
+                logger.debug("Ctrl+Alt+%s pressed, target: '%s'", char, self._target)
+                if char == self._target:
+                    logger.info(f"🎯 SHORTCUT TRIGGERED: Ctrl+Alt+{self.keynum}")
+                    # Hand off to the event loop to avoid blocking the listener
+                    self.trigger_shortcut()
         except Exception as e:
             logger.error(f"Error in on_press: {e}")
     
     def on_release(self, key):
         """Handle key release events"""
-        try:
-            self.pressed_keys.discard(key)
-        except KeyError:
-            pass
+        if key in CTRL_KEYS:
+            self._ctrl = False
+        elif key in ALT_KEYS:
+            self._alt = False
     
-    def run(self):
-        """Main service loop"""
-        logger.info(f"Starting {self.service_name} service with model: {self.ollama_model}")
-        logger.info(f"Listening for Ctrl+Alt+{self.keynum}")
+    def _on_shutdown_signal(self, stop):
+        """Call stop() on SIGINT/SIGTERM so the main thread can block without polling"""
+        def handler(signum, frame):
+            logger.info("Received interrupt signal")
+            stop()
         
-        # Ensure ollama is running
-        if not self.ensure_ollama_running():
-            logger.error("Failed to ensure ollama is running")
-            sys.exit(1)
+        signal.signal(signal.SIGINT, handler)
+        signal.signal(signal.SIGTERM, handler)
+    
+    def _wait_for_hotkey(self):
+        """Block while the X event thread delivers the grabbed shortcut"""
+        logger.info("Hotkey grabbed. Press Ctrl+Alt+{} to trigger {}.".format(self.keynum, self.service_name))
         
-        # Start keyboard listener
+        # Block until a signal stops the event thread
+        self._on_shutdown_signal(self.x11.interrupt)
+        self.x11.join()
+        if self.x11.connection_lost:
+            raise RuntimeError("Lost connection to the X server")
+    
+    def _listen_with_pynput(self):
+        """Watch every key event with pynput to detect the shortcut"""
         try:
             listener = Listener(
                 on_press=self.on_press, 
@@ -238,18 +580,45 @@ class BaseAIService(ABC):
             logger.info("Keyboard listener started. Press Ctrl+Alt+{} to trigger {}.".format(self.keynum, self.service_name))
             logger.info("Set DEBUG=1 environment variable for detailed key logging")
             
-            # Keep the main thread alive
-            try:
-                while listener.running:
-                    listener.join(timeout=1.0)
-            except KeyboardInterrupt:
-                logger.info("Received interrupt signal")
-                listener.stop()
+            # Block until a signal stops the listener
+            self._on_shutdown_signal(listener.stop)
+            listener.join()
                 
         except Exception as e:
             logger.error(f"Keyboard listener failed: {e}")
             logger.error("This might be a permissions issue. Try running with sudo or check X11 access.")
             raise
+    
+    def run(self):
+        """Main service loop"""
+        logger.info(f"Starting {self.service_name} service with model: {self.ollama_model}")
+        logger.info(f"Listening for Ctrl+Alt+{self.keynum}")
+        
+        # Start the event loop and HTTP session used for all Ollama requests
+        self._start_event_loop()
+        self.run_coroutine(self._open_session())
+        
+        # Ensure ollama is running
+        if not self.run_coroutine(self.ensure_ollama_running()):
+            logger.error("Failed to ensure ollama is running")
+            sys.exit(1)
+        
+        # Load the model in the background while the shortcut is being registered
+        # (unless the check above just loaded a freshly pulled model)
+        if not self._model_loaded:
+            asyncio.run_coroutine_threadsafe(self._pin_model(), self._loop)
+        
+        try:
+            # Prefer an X key grab: we are only woken for the shortcut itself,
+            # not for every keystroke. pynput is the fallback without python-xlib.
+            if self.x11 is not None and self.x11.grab_hotkey(str(self.keynum), self.trigger_shortcut):
+                self._wait_for_hotkey()
+            else:
+                self._listen_with_pynput()
+        finally:
+            self.run_coroutine(self._close_session())
+            if self.x11 is not None:
+                self.x11.stop()
 
 
 def main():
@@ -10,6 +10,7 @@ This example service:
 4. Logs the result (doesn't replace text)
 """
 
+import asyncio
 import logging
 from base_service import BaseAIService
 
@@ -29,7 +30,7 @@ class SummaryService(BaseAIService):
         """Return the system prompt for summarization"""
         return self.system_prompt
     
-    def get_input_text(self):
+    async def get_input_text(self):
         """Get input text - for this example, we'll use clipboard content"""
         import subprocess
         
@@ -37,11 +38,15 @@ class SummaryService(BaseAIService):
             logger.info("📖 Getting text from clipboard...")
             
             # Get clipboard content
-            result = subprocess.run(['xclip', '-selection', 'clipboard', '-o'], 
-                                  capture_output=True, text=True, timeout=2)
+            if self.x11 is not None:
+                text = await asyncio.to_thread(self.x11.get_selection, 'CLIPBOARD')
+            else:
+                result = await asyncio.to_thread(subprocess.run, ['xclip', '-selection', 'clipboard', '-o'], 
+                                                 capture_output=True, text=True, timeout=2)
+                text = result.stdout if result.returncode == 0 else None
             
-            if result.returncode == 0 and result.stdout.strip():
-                text = result.stdout.strip()
+            if text and text.strip():
+                text = text.strip()
                 logger.info(f"✓ Found text in clipboard: '{text[:50]}...'")
                 return text
                 
@@ -52,10 +57,10 @@ class SummaryService(BaseAIService):
             logger.warning(f"⚠️  Error getting text: {e}")
             return None
     
-    def process_trigger(self):
+    async def process_trigger(self):
         """Handle the summary trigger - main summary logic"""
         # Get input text (this service doesn't require text selection)
-        input_text = self.get_input_text()
+        input_text = await self.get_input_text()
         if not input_text:
             logger.info("❌ No text available, ignoring")
             return
@@ -66,7 +71,7 @@ class SummaryService(BaseAIService):
         logger.info("=" * 60)
         
         # Summarize the text using the base service's ollama communication
-        summary = self.send_to_ollama(self.get_system_prompt(), input_text)
+        summary = await self.send_to_ollama(self.get_system_prompt(), input_text)
         if not summary:
             logger.error("❌ Failed to summarize text")
             return
@@ -4,8 +4,8 @@ Rephrase service implementation.
 Handles text selection, rephrasing via Ollama, and text replacement.
 """
 
+import asyncio
 import subprocess
-import time
 import logging
 from base_service import BaseAIService
 
@@ -15,12 +15,20 @@ logger = logging.getLogger(__name__)
 class RephraseService(BaseAIService):
     """Service for rephrasing selected text using AI"""
     
+    # Start saving the clipboard once this much of the response has streamed in
+    CLIPBOARD_PREFETCH_CHARS = 50
+    
+    # Minimum time to keep the rephrased text on the clipboard after Ctrl+V
+    PASTE_MIN_DELAY_S = 0.1
+    
     def __init__(self):
         super().__init__("Rephrase")
         self.system_prompt = ("Please correct any grammatical errors and make structural improvements to the writing "
                             "while keeping the original tone and meaning. If you cannot rephrase it, "
                             "or change is not needed, return <null>. Return only the improved text "
                             "without any explanations or additional commentary.")
+        # Selections currently being rephrased (only touched on the event loop thread)
+        self._in_flight = set()
     
     def get_system_prompt(self) -> str:
         """Return the system prompt for rephrasing"""
@@ -33,17 +41,21 @@ class RephraseService(BaseAIService):
         cleaned_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL | re.IGNORECASE)
         return cleaned_text.strip()
     
-    def get_selected_text(self):
-        """Get currently selected text using xclip"""
+    async def get_selected_text(self):
+        """Get currently selected text from the X primary selection"""
         try:
             logger.info("📖 Attempting to get selected text...")
 
             # Try primary selection first (X11 mouse selection)
-            result = subprocess.run(['xclip', '-selection', 'primary', '-o'], 
-                                  capture_output=True, text=True, timeout=2)
+            if self.x11 is not None:
+                selected_text = await asyncio.to_thread(self.x11.get_selection, 'PRIMARY')
+            else:
+                result = await asyncio.to_thread(subprocess.run, ['xclip', '-selection', 'primary', '-o'], 
+                                                 capture_output=True, text=True, timeout=2)
+                selected_text = result.stdout if result.returncode == 0 else None
             
-            if result.returncode == 0 and result.stdout.strip():
-                selected_text = result.stdout.strip()
+            if selected_text and selected_text.strip():
+                selected_text = selected_text.strip()
                 logger.info(f"✓ Found text in primary selection: '{selected_text[:30]}...'")
                 return selected_text
             
@@ -60,49 +72,75 @@ class RephraseService(BaseAIService):
             logger.warning(f"⚠️  Unexpected error getting selected text: {e}")
             return None
     
-    def replace_selected_text(self, new_text):
-        """Replace selected text with new text"""
+    async def save_clipboard(self):
+        """Return the current clipboard content so it can be restored after pasting"""
+        try:
+            if self.x11 is not None:
+                current_clipboard = await asyncio.to_thread(self.x11.get_selection, 'CLIPBOARD') or ""
+                logger.debug(f"Saved current clipboard: '{current_clipboard[:50]}...'")
+                return current_clipboard
+            result = await asyncio.to_thread(subprocess.run, ['xclip', '-selection', 'clipboard', '-o'], 
+                                             capture_output=True, text=True, timeout=2)
+            current_clipboard = result.stdout
+            logger.debug(f"Saved current clipboard: '{current_clipboard[:50]}...'")
+            return current_clipboard
+        except:
+            logger.debug("Could not save current clipboard")
+            return ""
+    
+    async def replace_selected_text(self, new_text, current_clipboard=None):
+        """Replace selected text with new text.
+        
+        current_clipboard is restored after pasting; it is read here if not already saved.
+        """
         try:
             logger.info("🔄 Starting text replacement process...")
             
             # Save current clipboard content
-            try:
-                current_clipboard = subprocess.run(['xclip', '-selection', 'clipboard', '-o'], 
-                                                 capture_output=True, text=True, timeout=2).stdout
-                logger.debug(f"Saved current clipboard: '{current_clipboard[:50]}...'")
-            except:
-                current_clipboard = ""
-                logger.debug("Could not save current clipboard")
+            if current_clipboard is None:
+                current_clipboard = await self.save_clipboard()
             
-            # Copy new text to clipboard
-            logger.info("📋 Copying new text to clipboard...")
-            process = subprocess.Popen(['xclip', '-selection', 'clipboard'], 
-                                     stdin=subprocess.PIPE, text=True)
-            process.communicate(input=new_text)
+            if self.x11 is not None:
+                # Own the clipboard ourselves and paste via XTest; no subprocesses or fixed sleeps
+                logger.info("📋 Copying new text to clipboard...")
+                await asyncio.to_thread(self.x11.set_selection, 'CLIPBOARD', new_text)
+                logger.info("⌨️  Simulating Ctrl+V keypress...")
+                await asyncio.to_thread(self.x11.paste)
+                
+                # Restore original clipboard once the target window has fetched the new text,
+                # but never sooner than a short minimum delay
+                transferred, _ = await asyncio.gather(
+                    asyncio.to_thread(self.x11.wait_for_transfer, 'CLIPBOARD'),
+                    asyncio.sleep(self.PASTE_MIN_DELAY_S))
+                if not transferred:
+                    logger.debug("Paste target did not request the clipboard")
+                if current_clipboard:
+                    await asyncio.to_thread(self.x11.set_selection, 'CLIPBOARD', current_clipboard)
+                    logger.debug("✓ Original clipboard restored")
+                
+                logger.info("✅ Text replacement process completed")
+                return True
             
-            # Verify clipboard content
-            time.sleep(0.1)
-            try:
-                clipboard_check = subprocess.run(['xclip', '-selection', 'clipboard', '-o'], 
-                                               capture_output=True, text=True, timeout=2).stdout
-                logger.info(f"✓ Clipboard now contains: '{clipboard_check[:50]}...'")
-            except:
-                logger.warning("Could not verify clipboard content")
+            # Copy new text to clipboard (as bytes, skipping the text-mode encode/decode layer)
+            logger.info("📋 Copying new text to clipboard...")
+            await asyncio.to_thread(subprocess.run, ['xclip', '-selection', 'clipboard'],
+                                    input=new_text.encode('utf-8'))
             
             # Simulate Ctrl+V to paste
             logger.info("⌨️  Simulating Ctrl+V keypress...")
-            time.sleep(0.2)  # Slightly longer delay
-            subprocess.run(['xdotool', 'key', 'ctrl+v'], check=True, timeout=5)
+            await asyncio.sleep(0.05)  # Let the new clipboard owner propagate to X
+            # --clearmodifiers: Ctrl/Alt from the shortcut may still be held, which would send Ctrl+Alt+V
+            await asyncio.to_thread(subprocess.run, ['xdotool', 'key', '--clearmodifiers', 'ctrl+v'],
+                                    check=True, timeout=5)
             
-            # Give some time for the paste to complete
-            time.sleep(0.2)
+            # Give the target window time to fetch the clipboard before restoring it
+            await asyncio.sleep(0.2)
             
             # Restore original clipboard (optional)
             if current_clipboard:
                 try:
-                    process = subprocess.Popen(['xclip', '-selection', 'clipboard'], 
-                                             stdin=subprocess.PIPE, text=True)
-                    process.communicate(input=current_clipboard)
+                    await asyncio.to_thread(subprocess.run, ['xclip', '-selection', 'clipboard'],
+                                            input=current_clipboard.encode('utf-8'))
                     logger.debug("✓ Original clipboard restored")
                 except:
                     logger.debug("Could not restore original clipboard")
@@ -120,21 +158,45 @@ class RephraseService(BaseAIService):
             logger.error(f"❌ Unexpected error during text replacement: {e}")
             return False
     
-    def process_trigger(self):
+    async def process_trigger(self):
         """Handle the rephrase trigger - main rephrase logic"""
         # Get selected text (rephrase-specific requirement)
-        selected_text = self.get_selected_text()
+        selected_text = await self.get_selected_text()
         if not selected_text:
             logger.info("❌ No text selected, ignoring")
             return
         
+        # Coalesce repeated triggers on a selection that is already being rephrased
+        if selected_text in self._in_flight:
+            logger.info("⏳ Already rephrasing this text, ignoring")
+            return
+        
+        self._in_flight.add(selected_text)
+        try:
+            await self.rephrase_selection(selected_text)
+        finally:
+            self._in_flight.discard(selected_text)
+    
+    async def rephrase_selection(self, selected_text: str):
+        """Rephrase selected_text and paste the result over the selection"""
         logger.info("=" * 60)
         logger.info(f"📝 ORIGINAL TEXT:")
         logger.info(f"'{selected_text}'")
         logger.info("=" * 60)
         
-        # Rephrase the text using the base service's ollama communication
-        rephrased_text = self.send_to_ollama(self.get_system_prompt(), f'text to rephrase: {selected_text}')
+        # Save the clipboard in parallel with the tail of the generation
+        clipboard_task = None
+        
+        def on_chunk(text):
+            nonlocal clipboard_task
+            if clipboard_task is None and len(text) >= self.CLIPBOARD_PREFETCH_CHARS:
+                clipboard_task = asyncio.ensure_future(self.save_clipboard())
+        
+        # Rephrase the text using the base service's ollama communication.
+        # The prefix frames the selection as text to rephrase, not a question or instruction to follow.
+        rephrased_text = await self.send_to_ollama(self.get_system_prompt(), f'text to rephrase: {selected_text}',
+                                                   on_chunk=on_chunk)
+        current_clipboard = await clipboard_task if clipboard_task is not None else None
         if not rephrased_text:
             logger.error("❌ Failed to rephrase text")
             return
@@ -153,7 +215,7 @@ class RephraseService(BaseAIService):
         logger.info("=" * 60)
         
         # Replace the selected text (rephrase-specific action)
-        success = self.replace_selected_text(rephrased_text)
+        success = await self.replace_selected_text(rephrased_text, current_clipboard)
         if success:
             logger.info("✅ Text replacement completed successfully!")
         else:
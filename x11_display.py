@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Persistent X11 connection for text services.
+Reads and owns selections and synthesizes key presses over a single X connection,
+replacing per-call xclip/xdotool subprocesses.
+"""
+
+import threading
+import time
+import logging
+import Xlib.threaded  # Serialize access so the connection can be shared across threads
+from Xlib import X, XK, Xatom, display, error
+from Xlib.ext import xtest
+from Xlib.protocol import event as xevent
+
+logger = logging.getLogger(__name__)
+
+
+class X11Display:
+    """Single X connection used for selections and fake input"""
+
+    def __init__(self):
+        self.display = display.Display()
+        # Invisible window used to request and own selections
+        self.window = self.display.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+
+        self.UTF8_STRING = self.display.intern_atom('UTF8_STRING')
+        self.TARGETS = self.display.intern_atom('TARGETS')
+        self.TEXT = self.display.intern_atom('TEXT')
+        self.INCR = self.display.intern_atom('INCR')
+        self.WAKEUP = self.display.intern_atom('KEYBINDLLM_WAKEUP')
+        self._property = self.display.intern_atom('KEYBINDLLM_SELECTION')
+
+        # Selection atom -> bytes we serve while we own it
+        self._owned = {}
+        # Selection atom -> [threading.Event, result] for outstanding reads
+        self._pending = {}
+        # Selection atom -> threading.Event set once a requestor fetched our data
+        self._transferred = {}
+        self._lock = threading.Lock()
+        # (keycode, modifier mask) -> callback for grabbed hotkeys
+        self._hotkeys = {}
+        # Keys the user may still be holding from a shortcut (modifiers + grabbed keys)
+        self._shortcut_keycodes = {self.display.keysym_to_keycode(XK.string_to_keysym(k))
+                                   for k in ('Control_L', 'Control_R', 'Alt_L', 'Alt_R')} - {0}
+
+        # Set if the event thread exited because the X connection dropped
+        self.connection_lost = False
+
+        self._running = True
+        self._thread = threading.Thread(target=self._event_loop, name="x11-events", daemon=True)
+        self._thread.start()
+
+    def _atom(self, name: str) -> int:
+        """Return the atom for a selection name such as 'PRIMARY' or 'CLIPBOARD'"""
+        return self.display.intern_atom(name)
+
+    def _event_loop(self):
+        """Dispatch X events until stopped"""
+        while self._running:
+            try:
+                event = self.display.next_event()
+                if event.type == X.KeyPress:
+                    self._hotkey_pressed(event)
+                elif event.type == X.SelectionRequest:
+                    self._serve_selection(event)
+                elif event.type == X.SelectionNotify:
+                    self._selection_ready(event)
+                elif event.type == X.SelectionClear:
+                    self._owned.pop(event.atom, None)
+            except (error.ConnectionClosedError, OSError) as e:
+                # python-xlib keeps raising the same error once the socket is gone,
+                # so stop instead of spinning; run() exits and systemd restarts us
+                if self._running:
+                    logger.error(f"✗ Lost connection to the X server: {e}")
+                    self.connection_lost = True
+                self._running = False
+                break
+            except Exception as e:
+                if self._running:
+                    logger.error(f"Error handling X event: {e}")
+
+    def _hotkey_pressed(self, event):
+        """Invoke the callback registered for a grabbed key"""
+        # Ignore Caps Lock / Num Lock state when matching
+        modifiers = event.state & ~(X.LockMask | X.Mod2Mask)
+        callback = self._hotkeys.get((event.detail, modifiers))
+        if callback is not None:
+            callback()
+
+    def _serve_selection(self, event):
+        """Answer another client's request for a selection we own"""
+        data = self._owned.get(event.selection)
+        prop = event.property if event.property != X.NONE else event.target
+
+        if data is None:
+            prop = X.NONE
+        elif event.target == self.TARGETS:
+            event.requestor.change_property(prop, Xatom.ATOM, 32,
+                                            [self.TARGETS, self.UTF8_STRING, self.TEXT, Xatom.STRING])
+        elif event.target in (self.UTF8_STRING, self.TEXT, Xatom.STRING):
+            prop_type = Xatom.STRING if event.target == Xatom.STRING else self.UTF8_STRING
+            event.requestor.change_property(prop, prop_type, 8, data)
+        else:
+            prop = X.NONE
+
+        notify = xevent.SelectionNotify(time=event.time, requestor=event.requestor,
+                                        selection=event.selection, target=event.target,
+                                        property=prop)
+        event.requestor.send_event(notify)
+        self.display.flush()
+
+        if prop != X.NONE and event.target != self.TARGETS:
+            transferred = self._transferred.get(event.selection)
+            if transferred is not None:
+                transferred.set()
+
+    def _selection_ready(self, event):
+        """Store the result of a convert_selection request we issued"""
+        with self._lock:
+            pending = self._pending.get(event.selection)
+        if pending is None:
+            return
+
+        if event.property != X.NONE:
+            prop = self.window.get_full_property(event.property, X.AnyPropertyType)
+            self.window.delete_property(event.property)
+            if prop is None:
+                pass
+            elif prop.property_type == self.INCR:
+                logger.debug("Selection too large for a single transfer, ignoring")
+            else:
+                value = prop.value
+                pending[1] = value.decode('utf-8', errors='replace') if isinstance(value, bytes) else str(value)
+        pending[0].set()
+
+    def grab_hotkey(self, key: str, callback) -> bool:
+        """Grab Ctrl+Alt+key globally and call callback (on the event thread) when pressed.
+
+        Returns False if the key is unknown or another client already holds the grab.
+        """
+        keycode = self.display.keysym_to_keycode(XK.string_to_keysym(key))
+        if not keycode:
+            logger.error(f"✗ No keycode for key '{key}'")
+            return False
+
+        modifiers = X.ControlMask | X.Mod1Mask
+        root = self.display.screen().root
+        catch = error.CatchError(error.BadAccess)
+        # Grab with every Caps Lock / Num Lock combination so the shortcut works regardless
+        for lock_mask in (0, X.LockMask, X.Mod2Mask, X.LockMask | X.Mod2Mask):
+            root.grab_key(keycode, modifiers | lock_mask, True,
+                          X.GrabModeAsync, X.GrabModeAsync, onerror=catch)
+        self.display.sync()
+        if catch.get_error():
+            logger.error(f"✗ Ctrl+Alt+{key} is already grabbed by another application")
+            return False
+
+        self._hotkeys[(keycode, modifiers)] = callback
+        self._shortcut_keycodes.add(keycode)
+        return True
+
+    def join(self, timeout: float = None):
+        """Wait for the event thread to finish (after interrupt() or stop())"""
+        self._thread.join(timeout)
+
+    def get_selection(self, name: str, timeout: float = 2.0):
+        """Return the text of a selection ('PRIMARY' or 'CLIPBOARD'), or None"""
+        selection = self._atom(name)
+        if selection in self._owned:
+            return self._owned[selection].decode('utf-8')
+
+        pending = [threading.Event(), None]
+        with self._lock:
+            self._pending[selection] = pending
+        try:
+            self.window.convert_selection(selection, self.UTF8_STRING, self._property, X.CurrentTime)
+            self.display.flush()
+            if not pending[0].wait(timeout):
+                logger.warning(f"⚠️  Timed out reading {name} selection")
+                return None
+            return pending[1]
+        finally:
+            with self._lock:
+                self._pending.pop(selection, None)
+
+    def set_selection(self, name: str, text: str):
+        """Take ownership of a selection and serve text to anyone who requests it"""
+        selection = self._atom(name)
+        self._owned[selection] = text.encode('utf-8')
+        self._transferred[selection] = threading.Event()
+        self.window.set_selection_owner(selection, X.CurrentTime)
+        self.display.flush()
+
+    def wait_for_transfer(self, name: str, timeout: float = 1.0) -> bool:
+        """Wait until another client has fetched the selection we set (since the last paste())"""
+        transferred = self._transferred.get(self._atom(name))
+        return transferred is not None and transferred.wait(timeout)
+
+    def send_keys(self, *keysyms: str):
+        """Press the given keys in order, then release them in reverse (e.g. 'Control_L', 'v')"""
+        keycodes = [self.display.keysym_to_keycode(XK.string_to_keysym(k)) for k in keysyms]
+        for keycode in keycodes:
+            xtest.fake_input(self.display, X.KeyPress, keycode)
+        for keycode in reversed(keycodes):
+            xtest.fake_input(self.display, X.KeyRelease, keycode)
+        self.display.sync()
+
+    def _held_keycodes(self) -> set:
+        """Return the shortcut keys that are currently pressed"""
+        keymap = self.display.query_keymap()
+        return {k for k in self._shortcut_keycodes if keymap[k // 8] & (1 << (k % 8))}
+
+    def wait_for_shortcut_release(self, timeout: float = 1.0):
+        """Wait until the user lets go of the shortcut keys, then release any still held.
+
+        While the grabbed key is down we hold an active keyboard grab, and held Ctrl/Alt
+        would turn a synthesized Ctrl+V into Ctrl+Alt+V.
+        """
+        deadline = time.monotonic() + timeout
+        held = self._held_keycodes()
+        while held and time.monotonic() < deadline:
+            time.sleep(0.01)
+            held = self._held_keycodes()
+        for keycode in held:
+            xtest.fake_input(self.display, X.KeyRelease, keycode)
+        if held:
+            self.display.sync()
+
+    def paste(self):
+        """Simulate Ctrl+V in the focused window"""
+        self.wait_for_shortcut_release()
+        # Only fetches after Ctrl+V count as the paste; clipboard managers grab the
+        # clipboard as soon as its owner changes, before the target window does
+        transferred = self._transferred.get(self._atom('CLIPBOARD'))
+        if transferred is not None:
+            transferred.clear()
+        self.send_keys('Control_L', 'v')
+
+    def interrupt(self):
+        """Ask the event thread to exit (safe to call from a signal handler)"""
+        if not self._running:
+            return
+        self._running = False
+        # Wake next_event() with a message to our own window
+        wakeup = xevent.ClientMessage(window=self.window, client_type=self.WAKEUP, data=(32, [0] * 5))
+        self.window.send_event(wakeup)
+        self.display.flush()
+
+    def stop(self):
+        """Stop the event thread and close the connection"""
+        self.interrupt()
+        self._thread.join(timeout=1.0)
+        try:
+            self.display.close()
+        except (error.ConnectionClosedError, OSError):
+            pass  # Already disconnected